@@ -1,6 +1,11 @@
+import atexit
+import contextlib
+import itertools
 import logging
+import queue
 import sqlite3
-from collections.abc import Generator
+import threading
+from collections.abc import Generator, Iterable
 from contextlib import contextmanager
 from datetime import datetime, timezone
 from pathlib import Path
@@ -17,6 +22,42 @@ DB_PATH = _DEFAULT_DB_PATH
 # Module initialization flag
 _db_initialized = False
 
+# Per-thread connection reused by log_message, which runs once per captured
+# message. Bumping the generation (new path or init_db) makes every thread
+# reopen on its next write.
+_writer_local = threading.local()
+_writer_generation = 0
+
+# SQL expression mirroring utils.get_message_type, evaluated with SQLite's JSON
+# functions so aggregate queries don't ship every message into Python.
+# The nested CASEs guarantee no json_* call sees malformed JSON (which raises).
+_MESSAGE_TYPE_SQL = """
+    CASE WHEN json_valid(message) THEN
+        CASE WHEN json_type(message) = 'object'
+                  AND json_type(message, '$.jsonrpc') = 'text'
+                  AND json_extract(message, '$.jsonrpc') = '2.0' THEN
+            CASE
+                WHEN json_type(message, '$.id') IS NULL THEN
+                    CASE WHEN json_type(message, '$.method') IS NOT NULL
+                         THEN 'notification' ELSE 'unknown' END
+                WHEN json_type(message, '$.error') IS NOT NULL THEN 'error'
+                WHEN json_type(message, '$.result') IS NOT NULL THEN 'response'
+                WHEN json_type(message, '$.method') IS NOT NULL THEN 'request'
+                ELSE 'unknown'
+            END
+        ELSE 'unknown' END
+    ELSE 'unknown' END
+"""
+
+# 1 if the message is a JSON object with an "error" key, else 0. The instr()
+# check is a cheap prefilter: without that substring there is no such key, so
+# most messages skip JSON validation entirely.
+_HAS_ERROR_SQL = """
+    CASE WHEN instr(message, '"error"') AND json_valid(message) THEN
+        json_type(message, '$.error') IS NOT NULL
+    ELSE 0 END
+"""
+
 
 @contextmanager
 def get_db_connection(db_path: Path | None = None) -> Generator[sqlite3.Connection, None, None]:
@@ -46,6 +87,60 @@ def get_db_connection(db_path: Path | None = None) -> Generator[sqlite3.Connecti
         conn.close()
 
 
+def _get_writer_connection() -> sqlite3.Connection:
+    """
+    Return this thread's cached write connection, reopening it if stale.
+
+    Unlike get_db_connection the connection is kept open between calls, so
+    the capture hot path does not pay for an open/close per message.
+    """
+    if not DB_PATH:
+        raise ValueError("No database path provided")
+
+    key = (DB_PATH, _writer_generation)
+    conn = getattr(_writer_local, "conn", None)
+    if conn is None or _writer_local.key != key:
+        if conn is not None:
+            conn.close()
+        conn = sqlite3.connect(DB_PATH)
+        # With WAL (set in init_db) this skips the fsync on every commit; a
+        # power loss can only lose the last few commits, never corrupt the DB
+        conn.execute("PRAGMA synchronous=NORMAL")
+        _writer_local.conn = conn
+        _writer_local.key = key
+    return conn
+
+
+def _invalidate_writer_connections() -> None:
+    """Make every thread reopen its write connection on next use."""
+    global _writer_generation
+    _writer_generation += 1
+
+
+# Column list shared by every query that returns full log entries
+_SELECT_LOGS = (
+    "SELECT log_id, timestamp, src_ip, dst_ip, src_port, dst_port, direction,"
+    " message, transport_type, metadata, pid FROM logs"
+)
+
+
+def _row_to_log(row: sqlite3.Row) -> dict[str, Any]:
+    """Convert a logs table row into the MCPMessageLog dict format."""
+    return {
+        "log_id": row["log_id"],
+        "timestamp": datetime.fromisoformat(row["timestamp"]),
+        "src_ip": row["src_ip"],
+        "dst_ip": row["dst_ip"],
+        "src_port": row["src_port"],
+        "dst_port": row["dst_port"],
+        "direction": row["direction"],
+        "message": row["message"],
+        "transport_type": row["transport_type"] if row["transport_type"] is not None else "unknown",
+        "metadata": row["metadata"],
+        "pid": row["pid"],
+    }
+
+
 def init_db() -> None:
     """
     Initialize the SQLite database and ensure the logs table exists.
@@ -55,6 +150,9 @@ def init_db() -> None:
         raise ValueError("DB_PATH is not set or is empty")
 
     with get_db_connection() as conn:
+        # Persistent on the file: readers (web UI, MCP server) no longer block
+        # the capture writers and vice versa
+        conn.execute("PRAGMA journal_mode=WAL")
         cur = conn.cursor()
         cur.execute(
             """
@@ -73,8 +171,43 @@ def init_db() -> None:
             )
             """
         )
+        # fetch_logs orders by timestamp; transport_type rides along for filters
+        cur.execute(
+            "CREATE INDEX IF NOT EXISTS idx_logs_ts_transport ON logs(timestamp, transport_type)"
+        )
         conn.commit()
 
+    # The file may have been recreated; don't keep writing to an old handle
+    _invalidate_writer_connections()
+
+
+_INSERT_LOG = """
+    INSERT INTO logs (log_id, timestamp, src_ip, dst_ip, src_port, dst_port, direction, message, transport_type, metadata, pid)
+    VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+"""
+
+
+def _entry_to_row(entry: dict[str, Any]) -> tuple:
+    """Convert a log entry dict into an _INSERT_LOG parameter tuple."""
+    timestamp = entry.get("timestamp", datetime.now(tz=timezone.utc))
+    log_id = entry.get("log_id")
+    if not log_id:
+        raise ValueError("log_id is required")
+
+    return (
+        log_id,
+        timestamp.isoformat(),
+        entry.get("src_ip"),
+        entry.get("dst_ip"),
+        entry.get("src_port"),
+        entry.get("dst_port"),
+        entry.get("direction", "unknown"),
+        entry.get("message"),
+        entry.get("transport_type", "unknown"),
+        entry.get("metadata"),
+        entry.get("pid"),
+    )
+
 
 def log_message(entry: dict[str, Any]) -> None:
     """
@@ -94,33 +227,113 @@ def log_message(entry: dict[str, Any]) -> None:
             metadata (str): JSON string with additional metadata (optional)
             pid (int): Process ID for stdio transport (optional)
     """
-    timestamp = entry.get("timestamp", datetime.now(tz=timezone.utc))
-    log_id = entry.get("log_id")
-    if not log_id:
-        raise ValueError("log_id is required")
+    conn = _get_writer_connection()
+    # Commits on success, rolls back on error; the connection stays open
+    with conn:
+        conn.execute(_INSERT_LOG, _entry_to_row(entry))
 
-    with get_db_connection() as conn:
-        cur = conn.cursor()
-        cur.execute(
-            """
-            INSERT INTO logs (log_id, timestamp, src_ip, dst_ip, src_port, dst_port, direction, message, transport_type, metadata, pid)
-            VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
-            """,
-            (
-                log_id,
-                timestamp.isoformat(),
-                entry.get("src_ip"),
-                entry.get("dst_ip"),
-                entry.get("src_port"),
-                entry.get("dst_port"),
-                entry.get("direction", "unknown"),
-                entry.get("message"),
-                entry.get("transport_type", "unknown"),
-                entry.get("metadata"),
-                entry.get("pid"),
-            ),
-        )
-        conn.commit()
+
+def log_messages(entries: Iterable[dict[str, Any]]) -> None:
+    """
+    Insert several log entries in a single transaction.
+
+    Args:
+        entries: Log entries in the same format as log_message. If any entry
+            is invalid, none of them are written.
+    """
+    rows = [_entry_to_row(entry) for entry in entries]
+    if not rows:
+        return
+
+    conn = _get_writer_connection()
+    with conn:
+        conn.executemany(_INSERT_LOG, rows)
+
+
+class BatchLogWriter:
+    """
+    Write log entries from a background thread in batched transactions.
+
+    submit() never blocks the capture thread: entries are queued and a worker
+    thread drains the queue, writing up to max_batch entries per commit. If
+    the database falls behind and the queue fills up, the oldest queued entry
+    is dropped. Once stop() has been called, new entries are refused.
+    """
+
+    _STOP = object()
+
+    def __init__(self, max_queue: int = 10_000, max_batch: int = 500):
+        self.max_batch = max_batch
+        self.dropped = 0
+        self._queue: queue.Queue = queue.Queue(maxsize=max_queue)
+        self._thread: threading.Thread | None = None
+        # Guards _stopped so no entry is queued behind the stop sentinel and
+        # the drop-oldest path can never evict it
+        self._lock = threading.Lock()
+        self._stopped = False
+
+    def start(self) -> None:
+        """Start the worker thread; pending entries are flushed at exit."""
+        if self._thread is not None:
+            return
+        self._thread = threading.Thread(target=self._run, name="mcphawk-log-writer", daemon=True)
+        self._thread.start()
+        atexit.register(self.stop)
+
+    def submit(self, entry: dict[str, Any]) -> bool:
+        """Queue an entry for writing; returns False if the writer is stopped."""
+        with self._lock:
+            if self._stopped:
+                return False
+            while True:
+                try:
+                    self._queue.put_nowait(entry)
+                    return True
+                except queue.Full:
+                    with contextlib.suppress(queue.Empty):
+                        self._queue.get_nowait()
+                        self.dropped += 1
+                        if self.dropped % 1000 == 1:
+                            logger.warning(f"Log writer queue full, dropped {self.dropped} entries so far")
+
+    def stop(self, timeout: float = 5.0) -> None:
+        """Write everything queued so far and stop the worker thread."""
+        with self._lock:
+            self._stopped = True
+        thread, self._thread = self._thread, None
+        if thread is None:
+            return
+        atexit.unregister(self.stop)
+        self._queue.put(self._STOP)
+        thread.join(timeout)
+
+    def _run(self) -> None:
+        while True:
+            batch = [self._queue.get()]
+            # Take whatever else is already waiting, up to max_batch
+            while len(batch) < self.max_batch:
+                try:
+                    batch.append(self._queue.get_nowait())
+                except queue.Empty:
+                    break
+
+            stopping = any(entry is self._STOP for entry in batch)
+            entries = [entry for entry in batch if entry is not self._STOP]
+            if entries:
+                self._write(entries)
+            if stopping:
+                return
+
+    def _write(self, entries: list[dict[str, Any]]) -> None:
+        try:
+            log_messages(entries)
+        except Exception:
+            # One bad entry (e.g. a duplicate log_id) shouldn't lose the batch
+            for entry in entries:
+                try:
+                    log_message(entry)
+                except Exception as e:
+                    logger.error(f"Failed to write log entry {entry.get('log_id')}: {e}")
 
 
 def fetch_logs(limit: int = 100) -> list[dict[str, Any]]:
@@ -145,32 +358,15 @@ def fetch_logs(limit: int = 100) -> list[dict[str, Any]]:
     with get_db_connection(current_path) as conn:
         cur = conn.cursor()
         cur.execute(
-            """
-            SELECT log_id, timestamp, src_ip, dst_ip, src_port, dst_port, direction, message, transport_type, metadata, pid
-            FROM logs
+            f"""
+            {_SELECT_LOGS}
             ORDER BY timestamp DESC
             LIMIT ?
             """,
             (limit,),
         )
-        rows = cur.fetchall()
-
-    return [
-        {
-            "log_id": row["log_id"],
-            "timestamp": datetime.fromisoformat(row["timestamp"]),
-            "src_ip": row["src_ip"],
-            "dst_ip": row["dst_ip"],
-            "src_port": row["src_port"],
-            "dst_port": row["dst_port"],
-            "direction": row["direction"],
-            "message": row["message"],
-            "transport_type": row["transport_type"] if row["transport_type"] is not None else "unknown",
-            "metadata": row["metadata"],
-            "pid": row["pid"],
-        }
-        for row in rows
-    ]
+        # Convert while iterating the cursor so only one result list is held
+        return [_row_to_log(row) for row in cur]
 
 
 # Add this near the top of logger.py (after DB_PATH definition)
@@ -182,6 +378,7 @@ def set_db_path(path: str) -> None:
     if path:
         DB_PATH = Path(path)
         _db_initialized = False  # Reset initialization flag when path changes
+        _invalidate_writer_connections()
         logger.debug(f"set_db_path: Changed DB_PATH to {DB_PATH}")
     else:
         logger.warning(f"set_db_path: Ignoring empty path, keeping DB_PATH as {DB_PATH}")
@@ -215,9 +412,8 @@ def get_log_by_id(log_id: str) -> dict[str, Any] | None:
     with get_db_connection(current_path) as conn:
         cur = conn.cursor()
         cur.execute(
-            """
-            SELECT log_id, timestamp, src_ip, dst_ip, src_port, dst_port, direction, message, transport_type, metadata, pid
-            FROM logs
+            f"""
+            {_SELECT_LOGS}
             WHERE log_id = ?
             """,
             (log_id,),
@@ -227,19 +423,7 @@ def get_log_by_id(log_id: str) -> dict[str, Any] | None:
     if not row:
         return None
 
-    return {
-        "log_id": row["log_id"],
-        "timestamp": datetime.fromisoformat(row["timestamp"]),
-        "src_ip": row["src_ip"],
-        "dst_ip": row["dst_ip"],
-        "src_port": row["src_port"],
-        "dst_port": row["dst_port"],
-        "direction": row["direction"],
-        "message": row["message"],
-        "transport_type": row["transport_type"] if row["transport_type"] is not None else "unknown",
-        "metadata": row["metadata"],
-        "pid": row["pid"],
-    }
+    return _row_to_log(row)
 
 
 def fetch_logs_with_offset(limit: int = 100, offset: int = 0) -> list[dict[str, Any]]:
@@ -260,32 +444,37 @@ def fetch_logs_with_offset(limit: int = 100, offset: int = 0) -> list[dict[str,
     with get_db_connection(current_path) as conn:
         cur = conn.cursor()
         cur.execute(
-            """
-            SELECT log_id, timestamp, src_ip, dst_ip, src_port, dst_port, direction, message, transport_type, metadata, pid
-            FROM logs
+            f"""
+            {_SELECT_LOGS}
             ORDER BY log_id DESC
             LIMIT ? OFFSET ?
             """,
             (limit, offset),
         )
-        rows = cur.fetchall()
+        # Convert while iterating the cursor so only one result list is held
+        return [_row_to_log(row) for row in cur]
+
+
+def _build_search_query(by_term: bool, by_transport: bool, by_type: bool) -> str:
+    """Build the search_logs SQL for one combination of active filters."""
+    conditions = []
+    if by_term:
+        conditions.append("message LIKE ?")
+    if by_transport:
+        conditions.append("transport_type = ?")
+    if by_type:
+        # Classify in SQL so LIMIT applies to matching rows only
+        conditions.append(f"{_MESSAGE_TYPE_SQL} = ?")
+    where = f" WHERE {' AND '.join(conditions)}" if conditions else ""
+    return f"{_SELECT_LOGS}{where} ORDER BY log_id DESC LIMIT ?"
 
-    return [
-        {
-            "log_id": row["log_id"],
-            "timestamp": datetime.fromisoformat(row["timestamp"]),
-            "src_ip": row["src_ip"],
-            "dst_ip": row["dst_ip"],
-            "src_port": row["src_port"],
-            "dst_port": row["dst_port"],
-            "direction": row["direction"],
-            "message": row["message"],
-            "transport_type": row["transport_type"] if row["transport_type"] is not None else "unknown",
-            "metadata": row["metadata"],
-            "pid": row["pid"],
-        }
-        for row in rows
-    ]
+
+# One fixed statement per filter combination, so the SQL text is never
+# rebuilt per call and repeated searches reuse the same statement
+_SEARCH_QUERIES = {
+    flags: _build_search_query(*flags)
+    for flags in itertools.product((False, True), repeat=3)
+}
 
 
 def search_logs(search_term: str = "", message_type: str | None = None,
@@ -309,78 +498,32 @@ def search_logs(search_term: str = "", message_type: str | None = None,
     with get_db_connection(current_path) as conn:
         cur = conn.cursor()
 
-        query = "SELECT * FROM logs WHERE 1=1"
-        params = []
-
+        params: list[Any] = []
         if search_term:
-            query += " AND message LIKE ?"
             params.append(f"%{search_term}%")
-
         if transport_type:
-            query += " AND transport_type = ?"
             params.append(transport_type)
-
-        query += " ORDER BY log_id DESC LIMIT ?"
+        if message_type:
+            params.append(message_type)
         params.append(limit)
 
+        query = _SEARCH_QUERIES[bool(search_term), bool(transport_type), bool(message_type)]
         cur.execute(query, params)
-        rows = cur.fetchall()
-
-    # Filter by message type if specified
-    results = []
-    for row in rows:
-        log_dict = {
-            "log_id": row["log_id"],
-            "timestamp": datetime.fromisoformat(row["timestamp"]),
-            "src_ip": row["src_ip"],
-            "dst_ip": row["dst_ip"],
-            "src_port": row["src_port"],
-            "dst_port": row["dst_port"],
-            "direction": row["direction"],
-            "message": row["message"],
-            "transport_type": row["transport_type"] if row["transport_type"] is not None else "unknown",
-            "metadata": row["metadata"],
-            "pid": row["pid"],
-        }
-
-        # If message_type filter is specified, check it
-        if message_type:
-            from .utils import get_message_type
-            if get_message_type(row["message"]) != message_type:
-                continue
-
-        results.append(log_dict)
-
-    return results
+        return [_row_to_log(row) for row in cur]
 
 
 def get_traffic_stats() -> dict[str, Any]:
     """
     Get statistics about captured traffic.
 
+    Message classification runs inside SQLite (JSON1), so only one row per
+    transport type is returned to Python.
+
     Returns:
         Dictionary with traffic statistics.
     """
-    current_path = DB_PATH if DB_PATH else _DEFAULT_DB_PATH
-    if not current_path.exists():
-        return {
-            "total_logs": 0,
-            "requests": 0,
-            "responses": 0,
-            "notifications": 0,
-            "errors": 0,
-            "by_transport_type": {}
-        }
-
-    with get_db_connection(current_path) as conn:
-        cur = conn.cursor()
-
-        # Get all messages for analysis
-        cur.execute("SELECT message, transport_type FROM logs")
-        logs = cur.fetchall()
-
-    stats = {
-        "total_logs": len(logs),
+    stats: dict[str, Any] = {
+        "total_logs": 0,
         "requests": 0,
         "responses": 0,
         "notifications": 0,
@@ -388,30 +531,41 @@ def get_traffic_stats() -> dict[str, Any]:
         "by_transport_type": {}
     }
 
-    from .utils import get_message_type
+    current_path = DB_PATH if DB_PATH else _DEFAULT_DB_PATH
+    if not current_path.exists():
+        return stats
 
-    for message, transport_type in logs:
-        # Count by message type
-        msg_type = get_message_type(message)
-        if msg_type == "request":
-            stats["requests"] += 1
-        elif msg_type == "response":
-            stats["responses"] += 1
-        elif msg_type == "notification":
-            stats["notifications"] += 1
+    with get_db_connection(current_path) as conn:
+        cur = conn.cursor()
+        cur.execute(
+            f"""
+            SELECT transport_type,
+                   COUNT(*) AS total,
+                   SUM(msg_type = 'request') AS requests,
+                   SUM(msg_type = 'response') AS responses,
+                   SUM(msg_type = 'notification') AS notifications,
+                   SUM(has_error) AS errors
+            FROM (
+                SELECT transport_type,
+                       {_MESSAGE_TYPE_SQL} AS msg_type,
+                       {_HAS_ERROR_SQL} AS has_error
+                FROM logs
+            )
+            GROUP BY transport_type
+            """
+        )
+        rows = cur.fetchall()
 
-        # Check for errors
-        try:
-            import json
-            msg_data = json.loads(message)
-            if "error" in msg_data:
-                stats["errors"] += 1
-        except Exception:
-            pass
+    for row in rows:
+        stats["total_logs"] += row["total"]
+        stats["requests"] += row["requests"]
+        stats["responses"] += row["responses"]
+        stats["notifications"] += row["notifications"]
+        stats["errors"] += row["errors"]
 
         # Count by transport type
-        if transport_type:
-            stats["by_transport_type"][transport_type] = stats["by_transport_type"].get(transport_type, 0) + 1
+        if row["transport_type"]:
+            stats["by_transport_type"][row["transport_type"]] = row["total"]
 
     return stats
 
@@ -429,17 +583,14 @@ def get_unique_methods() -> list[str]:
 
     with get_db_connection(current_path) as conn:
         cur = conn.cursor()
-        cur.execute("SELECT message FROM logs")
-        logs = cur.fetchall()
-
-    methods = set()
-    for (message,) in logs:
-        try:
-            import json
-            msg_data = json.loads(message)
-            if "method" in msg_data:
-                methods.add(msg_data["method"])
-        except Exception:
-            pass
+        cur.execute(
+            """
+            SELECT DISTINCT json_extract(message, '$.method') AS method
+            FROM logs
+            WHERE CASE WHEN json_valid(message)
+                       THEN json_type(message, '$.method') = 'text' END
+            """
+        )
+        methods = [row["method"] for row in cur]
 
     return sorted(methods)
@@ -1,8 +1,9 @@
 """MCP server implementation using SDK's built-in HTTP transport."""
 
+import asyncio
 import json
 import logging
-from typing import Optional
+from typing import Any, Callable, Optional, TypeVar
 
 from mcp.server.fastmcp import FastMCP
 
@@ -11,6 +12,8 @@ from .. import logger as mcphawk_logger
 # Set up logging
 logger = logging.getLogger(__name__)
 
+T = TypeVar("T")
+
 
 class MCPHawkServer:
     """MCP server using SDK's HTTP transport."""
@@ -19,6 +22,7 @@ class MCPHawkServer:
         # Store configuration
         self.http_host = host
         self.http_port = port
+        self._offload_queries = False
 
         # FastMCP accepts host and port in constructor
         self.mcp = FastMCP("mcphawk-mcp", host=host, port=port)
@@ -26,13 +30,27 @@ class MCPHawkServer:
             mcphawk_logger.set_db_path(db_path)
         self._setup_handlers()
 
+    async def _query(self, func: Callable[..., T], *args: Any, **kwargs: Any) -> T:
+        """
+        Run a blocking logger query from a tool handler.
+
+        Over HTTP several clients share the event loop, so queries run in a
+        worker thread. Over stdio they run inline: there is a single client,
+        and the SDK cancels in-flight requests once stdin closes.
+        """
+        if self._offload_queries:
+            return await asyncio.to_thread(func, *args, **kwargs)
+        return func(*args, **kwargs)
+
     def _setup_handlers(self):
         """Setup MCP protocol handlers."""
 
         @self.mcp.tool()
         async def query_traffic(limit: int = 100, offset: int = 0) -> str:
             """Query captured MCP traffic with optional limit and offset."""
-            logs = mcphawk_logger.fetch_logs_with_offset(limit=limit, offset=offset)
+            logs = await self._query(
+                mcphawk_logger.fetch_logs_with_offset, limit=limit, offset=offset
+            )
 
             # Convert timestamps to ISO format for JSON serialization
             for log in logs:
@@ -44,7 +62,7 @@ class MCPHawkServer:
         @self.mcp.tool()
         async def get_log(log_id: str) -> str:
             """Get a specific log entry by ID."""
-            log = mcphawk_logger.get_log_by_id(log_id)
+            log = await self._query(mcphawk_logger.get_log_by_id, log_id)
 
             if not log:
                 return f"No log found with ID: {log_id}"
@@ -70,7 +88,8 @@ class MCPHawkServer:
                 transport_type: Filter by transport type (streamable_http/http_sse/stdio/unknown)
                 limit: Maximum number of results
             """
-            logs = mcphawk_logger.search_logs(
+            logs = await self._query(
+                mcphawk_logger.search_logs,
                 search_term=search_term,
                 message_type=message_type,
                 transport_type=transport_type,
@@ -87,13 +106,13 @@ class MCPHawkServer:
         @self.mcp.tool()
         async def get_stats() -> str:
             """Get statistics about captured traffic."""
-            stats = mcphawk_logger.get_traffic_stats()
+            stats = await self._query(mcphawk_logger.get_traffic_stats)
             return json.dumps(stats, indent=2)
 
         @self.mcp.tool()
         async def list_methods() -> str:
             """List all unique JSON-RPC methods seen in traffic."""
-            methods = mcphawk_logger.get_unique_methods()
+            methods = await self._query(mcphawk_logger.get_unique_methods)
 
             result = {
                 "methods": methods,
@@ -116,6 +135,8 @@ class MCPHawkServer:
             self.mcp = FastMCP("mcphawk-mcp", host=host, port=port)
             self._setup_handlers()
 
+        self._offload_queries = True
+
         # The SDK handles all the HTTP server setup internally
         await self.mcp.run_streamable_http_async()
 
@@ -1,4 +1,3 @@
-import asyncio
 import json
 import logging
 import platform
@@ -10,9 +9,10 @@ logging.getLogger("scapy.runtime").setLevel(logging.ERROR)
 
 from scapy.all import IP, TCP, IPv6, Raw, conf, sniff  # noqa: E402
 
-from mcphawk.logger import log_message  # noqa: E402
+from mcphawk.logger import BatchLogWriter, log_message  # noqa: E402
 from mcphawk.tcp_reassembly import TCPStreamReassembler  # noqa: E402
-from mcphawk.web.broadcaster import broadcast_new_log  # noqa: E402
+from mcphawk.utils import extract_server_info  # noqa: E402
+from mcphawk.web.broadcaster import broadcast_from_thread  # noqa: E402
 
 # Set up logger for this module
 logger = logging.getLogger(__name__)
@@ -26,19 +26,24 @@ def _get_connection_id(src_ip: str, src_port: int, dst_ip: str, dst_port: int) -
     return f"{src_ip}:{src_port}->{dst_ip}:{dst_port}"
 
 
-async def _safe_broadcast(log_entry: dict) -> None:
+def _broadcast_safely(log_entry: dict) -> None:
+    """Queue ``log_entry`` for the web UI; a broadcast failure never stops capture."""
     try:
-        await broadcast_new_log(log_entry)
+        broadcast_from_thread(log_entry)
     except Exception as e:
         logger.debug(f"Broadcast failed: {e}")
 
 
-def _broadcast_in_any_loop(log_entry: dict) -> None:
-    try:
-        loop = asyncio.get_running_loop()
-        _ = loop.create_task(_safe_broadcast(log_entry))  # noqa: RUF006
-    except RuntimeError:
-        asyncio.run(_safe_broadcast(log_entry))
+# Background writer used while start_sniffer runs; packet_callback writes
+# synchronously when it is called on its own
+_log_writer: BatchLogWriter | None = None
+
+
+def _store(entry: dict) -> None:
+    if _log_writer is not None:
+        _log_writer.submit(entry)
+    else:
+        log_message(entry)
 
 
 # Global variable to track auto-detect mode
@@ -91,7 +96,6 @@ def packet_callback(pkt):
             transport = msg_info.get("transport", "unknown")
 
             # Determine direction based on message type
-            from .utils import extract_server_info
             direction = "unknown"
 
             # For HTTP, incoming = server->client, outgoing = client->server
@@ -139,12 +143,12 @@ def packet_callback(pkt):
             if metadata:
                 entry["metadata"] = json.dumps(metadata)
 
-            log_message(entry)
+            _store(entry)
 
             # Convert timestamp to ISO only for WebSocket broadcast
             broadcast_entry = dict(entry)
             broadcast_entry["timestamp"] = ts.isoformat()
-            _broadcast_in_any_loop(broadcast_entry)
+            _broadcast_safely(broadcast_entry)
 
             # In auto-detect mode, log when we find MCP traffic
             if _auto_detect_mode:
@@ -242,7 +246,6 @@ def packet_callback(pkt):
                     logger.debug(f"Auto-detect: Found transport {transport} for {src_ip}:{src_port} -> {dst_ip}:{dst_port}")
 
                 # Determine direction and check for server info
-                from .utils import extract_server_info
                 direction = "unknown"
 
                 # For raw TCP, we need to infer direction
@@ -252,7 +255,7 @@ def packet_callback(pkt):
                     if "result" in msg or "error" in msg:
                         direction = "incoming"
                         # Check for server info
-                        server_info = extract_server_info(decoded)
+                        server_info = extract_server_info(msg)
                         if server_info:
                             conn_id = _get_connection_id(dst_ip, dst_port, src_ip, src_port)
                             _server_registry[conn_id] = server_info
@@ -289,12 +292,12 @@ def packet_callback(pkt):
                 if metadata:
                     entry["metadata"] = json.dumps(metadata)
 
-                log_message(entry)
+                _store(entry)
 
                 # Convert timestamp to ISO only for WebSocket broadcast
                 broadcast_entry = dict(entry)
                 broadcast_entry["timestamp"] = ts.isoformat()
-                _broadcast_in_any_loop(broadcast_entry)
+                _broadcast_safely(broadcast_entry)
         except Exception as e:
             logger.debug(f"JSON decode failed: {e}")
 
@@ -311,7 +314,7 @@ def start_sniffer(filter_expr: str = "tcp and port 12345", auto_detect: bool = F
         debug: If True, enable debug logging
         excluded_ports: List of ports to exclude from capture
     """
-    global _auto_detect_mode, _excluded_ports
+    global _auto_detect_mode, _excluded_ports, _log_writer
     _auto_detect_mode = auto_detect
     _excluded_ports = set(excluded_ports) if excluded_ports else set()
 
@@ -327,9 +330,16 @@ def start_sniffer(filter_expr: str = "tcp and port 12345", auto_detect: bool = F
     # Ensure better pcap support on macOS
     conf.use_pcap = True
 
+    # Keep SQLite commits off the capture thread
+    _log_writer = BatchLogWriter()
+    _log_writer.start()
+
     try:
         iface = "lo0" if platform.system() == "Darwin" else None
         sniff(filter=filter_expr, iface=iface, prn=packet_callback, store=False)
     except KeyboardInterrupt:
         logger.debug("Sniffer interrupted by user")
         raise
+    finally:
+        writer, _log_writer = _log_writer, None
+        writer.stop()
@@ -1,6 +1,7 @@
 """TCP stream reassembly for capturing complete HTTP/SSE responses."""
 
 import logging
+import time
 from typing import Optional
 
 from scapy.all import IP, TCP, IPv6, Raw
@@ -11,6 +12,7 @@ from .transport_detector import (
     detect_transport_from_http,
     extract_endpoint_from_sse,
 )
+from .utils import LRUDict
 
 logger = logging.getLogger(__name__)
 
@@ -50,6 +52,7 @@ class HTTPStream:
         self.request_path: Optional[str] = None
         self.request_headers: dict[str, str] = {}
         self.detected_transport: MCPTransport = MCPTransport.UNKNOWN
+        self.last_seen: float = time.monotonic()
 
     def add_request(self, data: bytes):
         """Add HTTP request data and parse headers."""
@@ -192,17 +195,20 @@ class HTTPStream:
         """Extract data from chunked transfer encoding."""
         # This is a simplified implementation
         # Real chunked parsing is more complex
-        complete_data = b""
-        original_buffer = self.buffer
+        # Walk the buffer with an offset and slice it once at the end, rather
+        # than re-copying the remainder after every chunk
+        chunks: list[bytes] = []
+        buffer = self.buffer
+        pos = 0
 
         while True:
             # Find chunk size
-            if b"\r\n" not in self.buffer:
+            size_end = buffer.find(b"\r\n", pos)
+            if size_end < 0:
                 logger.debug("extract_chunked_data: No CRLF in buffer, need more data")
                 break
 
-            size_end = self.buffer.find(b"\r\n")
-            chunk_size_str = self.buffer[:size_end].decode('utf-8', errors='ignore').strip()
+            chunk_size_str = buffer[pos:size_end].decode('utf-8', errors='ignore').strip()
             logger.debug(f"extract_chunked_data: Chunk size string: '{chunk_size_str}'")
 
             try:
@@ -214,7 +220,8 @@ class HTTPStream:
 
             if chunk_size == 0:
                 # Last chunk - consume it from buffer
-                self.buffer = self.buffer[size_end + 4:]  # Skip "0\r\n\r\n"
+                self.buffer = buffer[size_end + 4:]  # Skip "0\r\n\r\n"
+                complete_data = b"".join(chunks)
                 logger.debug(f"extract_chunked_data: Found last chunk (size 0), returning {len(complete_data)} bytes")
                 return complete_data if complete_data else None
 
@@ -222,18 +229,22 @@ class HTTPStream:
             chunk_start = size_end + 2
             chunk_end = chunk_start + chunk_size + 2  # +2 for trailing \r\n
 
-            if len(self.buffer) < chunk_end:
-                # Need more data - restore original buffer and return what we have so far
-                logger.debug(f"extract_chunked_data: Need more data, have {len(self.buffer)}, need {chunk_end}")
-                self.buffer = original_buffer
+            if len(buffer) < chunk_end:
+                # Need more data - keep the original buffer and return what we have so far
+                logger.debug(f"extract_chunked_data: Need more data, have {len(buffer) - pos}, need {chunk_end - pos}")
+                pos = 0
                 break
 
-            chunk_data = self.buffer[chunk_start:chunk_start + chunk_size]
+            chunk_data = buffer[chunk_start:chunk_start + chunk_size]
             logger.debug(f"extract_chunked_data: Extracted chunk of {len(chunk_data)} bytes")
-            complete_data += chunk_data
-            self.buffer = self.buffer[chunk_end:]
+            chunks.append(chunk_data)
+            pos = chunk_end
 
-        if complete_data:
+        if pos:
+            self.buffer = buffer[pos:]
+
+        if chunks:
+            complete_data = b"".join(chunks)
             logger.debug(f"extract_chunked_data: Returning {len(complete_data)} bytes of unchunked data")
             return complete_data
         return None  # Not complete yet
@@ -242,9 +253,16 @@ class HTTPStream:
 class TCPStreamReassembler:
     """Reassembles TCP streams to capture complete HTTP messages."""
 
-    def __init__(self):
-        self.streams: dict[StreamKey, HTTPStream] = {}
+    # Packets between inline sweeps for idle streams
+    CLEANUP_INTERVAL = 1024
+
+    def __init__(self, max_streams: int = 4096, stream_timeout: int = 300):
+        # Kept in least-recently-seen order; bounded so closed flows that never
+        # send more data can't grow memory without limit
+        self.streams: LRUDict = LRUDict(max_streams)
+        self.stream_timeout = stream_timeout
         self.transport_tracker = TransportTracker()
+        self._packets_since_cleanup = 0
 
     def process_packet(self, pkt) -> list[dict]:
         """Process a packet and return any complete messages."""
@@ -285,10 +303,17 @@ class TCPStreamReassembler:
             logger.debug(f"TCP reassembly: Stream key for port 8765: {stream_key}")
 
         # Get or create stream
-        if stream_key not in self.streams:
-            self.streams[stream_key] = HTTPStream()
+        stream = self.streams.get(stream_key)
+        if stream is None:
+            stream = self.streams[stream_key] = HTTPStream()
             logger.debug(f"TCP reassembly: Created new stream for {stream_key}")
-        stream = self.streams[stream_key]
+        else:
+            self.streams.move_to_end(stream_key)
+            stream.last_seen = time.monotonic()
+
+        self._packets_since_cleanup += 1
+        if self._packets_since_cleanup >= self.CLEANUP_INTERVAL:
+            self.cleanup_old_streams(self.stream_timeout)
 
         # Check if this is an HTTP request
         if payload.startswith(b"POST ") or payload.startswith(b"GET "):
@@ -415,7 +440,18 @@ class TCPStreamReassembler:
 
         return messages
 
-    def cleanup_old_streams(self, timeout: int = 300):
-        """Remove old streams to prevent memory leaks."""
-        # TODO: Implement timeout-based cleanup
-        pass
+    def cleanup_old_streams(self, timeout: int = 300) -> int:
+        """Remove streams idle for more than timeout seconds; returns how many."""
+        self._packets_since_cleanup = 0
+        cutoff = time.monotonic() - timeout
+        removed = 0
+        # Oldest streams come first, so stop at the first one still active
+        while self.streams:
+            key, stream = next(iter(self.streams.items()))
+            if stream.last_seen >= cutoff:
+                break
+            del self.streams[key]
+            removed += 1
+        if removed:
+            logger.debug(f"TCP reassembly: Removed {removed} idle streams")
+        return removed
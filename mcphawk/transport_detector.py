@@ -1,9 +1,12 @@
 """MCP transport detection logic."""
 
+import json
 import logging
 from enum import Enum
 from typing import Optional
 
+from .utils import LRUDict
+
 logger = logging.getLogger(__name__)
 
 
@@ -44,15 +47,20 @@ def detect_transport_from_http(
     Args:
         method: HTTP method (GET, POST)
         path: HTTP path
-        headers: HTTP headers
+        headers: HTTP headers (keys must already be lowercased)
         is_sse_response: Whether response has SSE content-type
         response_contains_endpoint_event: Whether SSE stream contains endpoint event
 
     Returns:
         Detected MCP transport type
     """
+    # Header keys are lowercased by the capture layer; normalize the Accept
+    # value once and split it into media types (dropping any ;q= parameters)
+    accept_header = headers.get("accept", "").lower()
+    accept_types = {t.split(";", 1)[0].strip() for t in accept_header.split(",")}
+
     # HTTP+SSE: GET with Accept: text/event-stream (single type)
-    if method == "GET" and headers.get("accept", "").lower() == "text/event-stream":
+    if method == "GET" and accept_header.strip() == "text/event-stream":
         # This is HTTP+SSE establishing SSE connection
         if response_contains_endpoint_event:
             logger.debug("Detected HTTP+SSE transport (endpoint event found)")
@@ -62,8 +70,7 @@ def detect_transport_from_http(
         return MCPTransport.HTTP_SSE
 
     # Streamable HTTP: POST with Accept: application/json, text/event-stream (BOTH types)
-    accept_header = headers.get("accept", "").lower()
-    if method == "POST" and "application/json" in accept_header and "text/event-stream" in accept_header:
+    if method == "POST" and "application/json" in accept_types and "text/event-stream" in accept_types:
         logger.debug("Detected Streamable HTTP transport (POST with dual accept)")
         return MCPTransport.STREAMABLE_HTTP
 
@@ -76,7 +83,7 @@ def detect_transport_from_http(
     if is_sse_response:
         # In Streamable HTTP, SSE is a response to POST
         # In HTTP+SSE, SSE is response to GET
-        logger.debug(f"SSE response detected, method was {method}")
+        logger.debug("SSE response detected, method was %s", method)
         if method == "POST":
             return MCPTransport.STREAMABLE_HTTP
         else:
@@ -100,7 +107,9 @@ def extract_endpoint_from_sse(sse_data: str) -> Optional[str]:
     Returns:
         Endpoint URL if found, None otherwise
     """
-    import json
+    # Most SSE blocks are message events; skip parsing unless this could be one
+    if "endpoint" not in sse_data:
+        return None
 
     lines = sse_data.strip().split('\n')
     event_type = None
@@ -117,19 +126,26 @@ def extract_endpoint_from_sse(sse_data: str) -> Optional[str]:
             data = json.loads(data_content)
             return data.get("url")
         except json.JSONDecodeError:
-            logger.debug(f"Failed to parse endpoint data: {data_content}")
+            logger.debug("Failed to parse endpoint data: %s", data_content)
 
     return None
 
 
 class TransportTracker:
-    """Track transport type per connection and server."""
+    """Track transport type per connection and server.
+
+    Values are the shared MCPTransport members, so each entry only costs its
+    key tuple and a reference.
+    """
+
+    __slots__ = ("endpoint_urls", "http_sse_servers", "transports")
 
-    def __init__(self):
-        self.transports: dict[tuple[str, int, str, int], MCPTransport] = {}
-        self.endpoint_urls: dict[tuple[str, int, str, int], str] = {}
+    def __init__(self, max_connections: int = 50_000, max_servers: int = 1024):
+        # Bounded so scan traffic or long captures can't grow memory without limit
+        self.transports: LRUDict = LRUDict(max_connections)
+        self.endpoint_urls: LRUDict = LRUDict(max_connections)
         # Track HTTP+SSE servers by IP:port
-        self.http_sse_servers: dict[tuple[str, int], MCPTransport] = {}
+        self.http_sse_servers: LRUDict = LRUDict(max_servers)
 
     def update_transport(
         self,
@@ -147,13 +163,13 @@ class TransportTracker:
         if transport != MCPTransport.UNKNOWN:
             self.transports[key] = transport
             self.transports[reverse_key] = transport
-            logger.debug(f"Updated transport for {key}: {transport.value}")
+            logger.debug("Updated transport for %s: %s", key, transport.value)
 
             # For HTTP+SSE, also track the server endpoint
             if transport == MCPTransport.HTTP_SSE:
                 server_key = (dst_ip, dst_port)
                 self.http_sse_servers[server_key] = transport
-                logger.debug(f"Marked server {dst_ip}:{dst_port} as HTTP+SSE")
+                logger.debug("Marked server %s:%s as HTTP+SSE", dst_ip, dst_port)
 
     def get_transport(
         self,
@@ -166,19 +182,26 @@ class TransportTracker:
         key = (src_ip, src_port, dst_ip, dst_port)
 
         # First check if we have transport for this exact connection
-        if key in self.transports:
-            return self.transports[key]
+        transport = self.transports.get(key)
+        if transport is not None:
+            # Keep active connections from being evicted; both directions
+            # were stored together, so refresh them together
+            self.transports.move_to_end(key)
+            reverse_key = (dst_ip, dst_port, src_ip, src_port)
+            if reverse_key in self.transports:
+                self.transports.move_to_end(reverse_key)
+            return transport
 
         # For HTTP+SSE, check if the destination OR source is a known HTTP+SSE server
         dst_server_key = (dst_ip, dst_port)
         if dst_server_key in self.http_sse_servers:
-            logger.debug(f"Found HTTP+SSE server {dst_ip}:{dst_port} for new connection")
+            logger.debug("Found HTTP+SSE server %s:%s for new connection", dst_ip, dst_port)
             return self.http_sse_servers[dst_server_key]
 
         # Also check if source is an HTTP+SSE server (for responses)
         src_server_key = (src_ip, src_port)
         if src_server_key in self.http_sse_servers:
-            logger.debug(f"Response from HTTP+SSE server {src_ip}:{src_port}")
+            logger.debug("Response from HTTP+SSE server %s:%s", src_ip, src_port)
             return self.http_sse_servers[src_server_key]
 
         return MCPTransport.UNKNOWN
@@ -194,4 +217,4 @@ class TransportTracker:
         """Store endpoint URL for HTTP+SSE transport."""
         key = (src_ip, src_port, dst_ip, dst_port)
         self.endpoint_urls[key] = endpoint_url
-        logger.debug(f"Stored endpoint URL for {key}: {endpoint_url}")
+        logger.debug("Stored endpoint URL for %s: %s", key, endpoint_url)
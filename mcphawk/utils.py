@@ -1,20 +1,52 @@
 """Utility functions for MCPHawk."""
 
 import json
-from typing import Any, Optional
+from collections import OrderedDict
+from itertools import product
+from typing import Any, Optional, Union
 
+Message = Union[str, dict[str, Any]]
 
-def parse_message(message: str) -> Optional[dict[str, Any]]:
-    """Parse a JSON message string."""
-    try:
-        if isinstance(message, str):
-            return json.loads(message)
+
+def parse_message(message: Message) -> Optional[dict[str, Any]]:
+    """
+    Parse a JSON message string.
+
+    Already-parsed dicts are returned as-is. Returns None for invalid JSON and
+    for JSON values that are not objects (e.g. batch arrays or scalars).
+    """
+    if isinstance(message, dict):
         return message
+    try:
+        parsed = json.loads(message)
     except (json.JSONDecodeError, TypeError):
         return None
+    return parsed if isinstance(parsed, dict) else None
+
+
+def _classify(has_id: bool, has_method: bool, has_result: bool, has_error: bool) -> str:
+    # Error response (has error and id)
+    if has_error and has_id:
+        return "error"
+    # Response (has result and id)
+    if has_result and has_id:
+        return "response"
+    # Request (has method and id)
+    if has_method and has_id:
+        return "request"
+    # Notification (has method but no id)
+    if has_method:
+        return "notification"
+    return "unknown"
+
 
+# (has_id, has_method, has_result, has_error) -> message type, for every combination
+_TYPE_TABLE: dict[tuple[bool, bool, bool, bool], str] = {
+    key: _classify(*key) for key in product((False, True), repeat=4)
+}
 
-def get_message_type(message: str) -> str:
+
+def get_message_type(message: Message) -> str:
     """
     Determine the type of a JSON-RPC message.
 
@@ -28,32 +60,18 @@ def get_message_type(message: str) -> str:
     if parsed.get("jsonrpc") != "2.0":
         return "unknown"
 
-    # Error response (has error and id)
-    if "error" in parsed and "id" in parsed:
-        return "error"
-
-    # Response (has result and id)
-    if "result" in parsed and "id" in parsed:
-        return "response"
-
-    # Request (has method and id)
-    if "method" in parsed and "id" in parsed:
-        return "request"
-
-    # Notification (has method but no id)
-    if "method" in parsed and "id" not in parsed:
-        return "notification"
-
-    return "unknown"
+    return _TYPE_TABLE[
+        "id" in parsed, "method" in parsed, "result" in parsed, "error" in parsed
+    ]
 
 
-def get_method_name(message: str) -> Optional[str]:
+def get_method_name(message: Message) -> Optional[str]:
     """Extract method name from a JSON-RPC message."""
     parsed = parse_message(message)
     return parsed.get("method") if parsed else None
 
 
-def extract_server_info(message: str) -> Optional[dict[str, str]]:
+def extract_server_info(message: Message) -> Optional[dict[str, str]]:
     """
     Extract serverInfo from an initialize response.
 
@@ -77,7 +95,7 @@ def extract_server_info(message: str) -> Optional[dict[str, str]]:
     return None
 
 
-def extract_client_info(message: str) -> Optional[dict[str, str]]:
+def extract_client_info(message: Message) -> Optional[dict[str, str]]:
     """
     Extract clientInfo from an initialize request.
 
@@ -101,3 +119,17 @@ def extract_client_info(message: str) -> Optional[dict[str, str]]:
                 }
 
     return None
+
+
+class LRUDict(OrderedDict):
+    """OrderedDict that evicts the least recently written entry past maxsize."""
+
+    def __init__(self, maxsize: int):
+        super().__init__()
+        self.maxsize = maxsize
+
+    def __setitem__(self, key, value) -> None:
+        super().__setitem__(key, value)
+        self.move_to_end(key)
+        if len(self) > self.maxsize:
+            self.popitem(last=False)
@@ -1,38 +1,185 @@
+import asyncio
+import json
 import logging
-from typing import Any
+import threading
+from collections import deque
+from typing import Any, Optional
 
 from fastapi import WebSocket
 
 # Set up logger for this module
 logger = logging.getLogger(__name__)
 
-active_clients: list[WebSocket] = []
+active_clients: set[WebSocket] = set()
+
+# Seconds between keep-alive pings sent to every connected client
+HEARTBEAT_INTERVAL = 30.0
+
+# Seconds a single send may take before the client is treated as stalled
+# and dropped, so one slow client can't hold up every other broadcast
+SEND_TIMEOUT = 5.0
+
+# Most entries waiting to be broadcast; past that the oldest are dropped
+MAX_PENDING = 10_000
+
+_heartbeat_task: Optional[asyncio.Task] = None
+
+# Event loop serving the WebSocket clients, so capture threads can hand
+# broadcasts to it instead of spinning up a loop of their own
+_client_loop: Optional[asyncio.AbstractEventLoop] = None
+
+# Entries handed over by capture threads, waiting to be sent in order.
+# _drain_scheduled is True while a drain task is queued or running on the
+# client loop, so a burst of entries costs one hand-off instead of one each
+_pending: deque[dict[str, Any]] = deque(maxlen=MAX_PENDING)
+_drain_lock = threading.Lock()
+_drain_scheduled = False
+_dropped = 0
+
+# Close tasks for stalled clients, referenced until done so they aren't
+# garbage collected mid-close
+_closing: set[asyncio.Task] = set()
+
+
+async def _send_to_all(payload: str) -> None:
+    """Send one text frame to every client and drop the ones that fail."""
+    # Snapshot the client list so connects/disconnects during the sends are safe
+    clients = list(active_clients)
+    results = await asyncio.gather(
+        *(asyncio.wait_for(ws.send_text(payload), SEND_TIMEOUT) for ws in clients),
+        return_exceptions=True,
+    )
+
+    disconnected = []
+    for ws, result in zip(clients, results):
+        if isinstance(result, Exception):
+            logger.debug("Failed to send to client: %s", type(result).__name__)
+            disconnected.append(ws)
+            if isinstance(result, asyncio.TimeoutError):
+                # The socket is still open; close it so its endpoint returns
+                # and the dashboard reconnects instead of silently freezing
+                task = asyncio.get_running_loop().create_task(_close_stalled(ws))
+                _closing.add(task)
+                task.add_done_callback(_closing.discard)
+
+    # Clean up disconnected clients
+    if disconnected:
+        active_clients.difference_update(disconnected)
+        logger.debug("Removed %d disconnected clients, %d remaining", len(disconnected), len(active_clients))
+
+
+async def _close_stalled(ws: WebSocket) -> None:
+    """Close a client that stopped accepting sends."""
+    try:
+        await asyncio.wait_for(ws.close(code=1011), SEND_TIMEOUT)
+    except Exception as e:
+        logger.debug("Failed to close stalled client: %s", type(e).__name__)
 
 
 async def broadcast_new_log(log_entry: dict[str, Any]):
     """
     Broadcast a new log entry to all connected WebSocket clients.
 
+    The entry is JSON-encoded once and the same text frame is sent to every
+    client; sends are issued concurrently so a slow client does not delay
+    the others.
+
     Args:
         log_entry: Dictionary representing the new log entry.
     """
     if not active_clients:
         return
 
-    disconnected = []
     # Only show client count, not the full log entry
-    logger.debug(f"Broadcasting to {len(active_clients)} clients")
+    logger.debug("Broadcasting to %d clients", len(active_clients))
 
-    for ws in active_clients:
-        try:
-            await ws.send_json(log_entry)
-        except Exception as e:
-            logger.debug(f"Failed to send to client: {type(e).__name__}")
-            disconnected.append(ws)
+    # Same encoding Starlette's send_json uses, done once instead of per client
+    await _send_to_all(json.dumps(log_entry, separators=(",", ":"), ensure_ascii=False))
 
-    # Clean up disconnected clients
-    if disconnected:
-        for ws in disconnected:
-            if ws in active_clients:
-                active_clients.remove(ws)
-        logger.debug(f"Removed {len(disconnected)} disconnected clients, {len(active_clients)} remaining")
+
+async def _heartbeat() -> None:
+    """Ping all clients periodically; exits once the last client is gone."""
+    payload = json.dumps({"type": "ping"}, separators=(",", ":"))
+    while active_clients:
+        await asyncio.sleep(HEARTBEAT_INTERVAL)
+        await _send_to_all(payload)
+
+
+def add_client(websocket: WebSocket) -> None:
+    """
+    Register a connected client and make sure the shared heartbeat is running.
+
+    One task pings every client, instead of each connection running its own
+    timer. Must be called from the event loop serving the WebSockets.
+    """
+    global _heartbeat_task, _client_loop
+    active_clients.add(websocket)
+
+    loop = asyncio.get_running_loop()
+    if _client_loop is not loop:
+        _reset_pending()
+    _client_loop = loop
+    if _heartbeat_task is None or _heartbeat_task.done() or _heartbeat_task.get_loop() is not loop:
+        _heartbeat_task = loop.create_task(_heartbeat())
+
+
+def broadcast_from_thread(log_entry: dict[str, Any]) -> None:
+    """
+    Queue a log entry for broadcast on the event loop that owns the clients.
+
+    Safe to call from any thread (e.g. the sniffer or stdio wrapper threads).
+    Entries are sent in the order they were queued; if clients fall more
+    than MAX_PENDING entries behind, the oldest are dropped. Does nothing
+    when no client is connected.
+    """
+    global _drain_scheduled, _dropped
+    loop = _client_loop
+    if loop is None or loop.is_closed() or not active_clients:
+        return
+
+    with _drain_lock:
+        if len(_pending) == _pending.maxlen:
+            # The deque evicts the oldest entry on append
+            _dropped += 1
+            if _dropped % 1000 == 1:
+                logger.warning("Broadcast queue full, dropped %d entries so far", _dropped)
+        _pending.append(log_entry)
+        if _drain_scheduled:
+            return
+        _drain_scheduled = True
+
+    try:
+        loop.call_soon_threadsafe(_start_drain)
+    except RuntimeError:
+        # Loop closed in the meantime
+        _reset_pending()
+
+
+def _start_drain() -> None:
+    asyncio.get_running_loop().create_task(_drain_pending())
+
+
+async def _drain_pending() -> None:
+    """Broadcast queued entries until the queue is empty."""
+    global _drain_scheduled
+    try:
+        while True:
+            while _pending:
+                await broadcast_new_log(_pending.popleft())
+            # Re-check under the lock so an entry queued right now either
+            # gets sent here or schedules a new drain
+            with _drain_lock:
+                if not _pending:
+                    _drain_scheduled = False
+                    return
+    except BaseException:
+        _reset_pending()
+        raise
+
+
+def _reset_pending() -> None:
+    """Forget queued entries, e.g. when the client loop goes away."""
+    global _drain_scheduled
+    with _drain_lock:
+        _pending.clear()
+        _drain_scheduled = False
@@ -1,4 +1,3 @@
-import asyncio
 import logging
 import os
 import threading
@@ -10,7 +9,7 @@ from fastapi.responses import JSONResponse
 from fastapi.staticfiles import StaticFiles
 
 from mcphawk.logger import fetch_logs
-from mcphawk.web.broadcaster import active_clients
+from mcphawk.web.broadcaster import active_clients, add_client
 
 # Set up logger for this module
 logger = logging.getLogger(__name__)
@@ -53,14 +52,11 @@ def get_logs(limit: int = 50):
     """
     logs = fetch_logs(limit)
     logger.debug(f"/logs returned {len(logs)} entries")
-    return JSONResponse(content=[
-        {
-            **log,
-            "timestamp": log["timestamp"].isoformat(),  # ensure JSON-friendly
-            "transport_type": log.get("transport_type", "unknown")  # ensure transport_type is included
-        }
-        for log in logs
-    ])
+    # Rows are freshly built dicts, so patch them in place instead of copying
+    for log in logs:
+        log["timestamp"] = log["timestamp"].isoformat()  # ensure JSON-friendly
+        log.setdefault("transport_type", "unknown")  # ensure transport_type is included
+    return JSONResponse(content=logs)
 
 
 @app.websocket("/ws")
@@ -70,29 +66,19 @@ async def websocket_endpoint(websocket: WebSocket):
     Keeps the connection alive until the client disconnects.
     """
     await websocket.accept()
-    active_clients.append(websocket)
+    add_client(websocket)
     logger.debug(f"WebSocket connected: {len(active_clients)} active clients")
 
     try:
-        while True:
-            # Keep connection alive with ping
-            try:
-                await asyncio.wait_for(
-                    websocket.receive_text(),  # Wait for any message
-                    timeout=30.0
-                )
-            except asyncio.TimeoutError:
-                # Send ping to check if client is still alive
-                try:
-                    await websocket.send_json({"type": "ping"})
-                except Exception:
-                    break
+        # Keep-alive pings come from the shared heartbeat; just drain incoming
+        # frames until the client goes away (iter_text ends on disconnect)
+        async for _ in websocket.iter_text():
+            pass
     except (WebSocketDisconnect, ConnectionResetError, Exception) as e:
         if not isinstance(e, WebSocketDisconnect):
             logger.debug(f"WebSocket error: {type(e).__name__}: {e}")
     finally:
-        if websocket in active_clients:
-            active_clients.remove(websocket)
+        active_clients.discard(websocket)
         logger.debug(f"WebSocket disconnected: {len(active_clients)} active clients")
 
 
@@ -1,28 +1,35 @@
 """MCP server wrapper for transparent stdio monitoring."""
 
-import asyncio
+import codecs
 import contextlib
 import json
 import logging
 import os
+import selectors
 import signal
 import subprocess
 import sys
 import threading
-import time
 import uuid
 from datetime import datetime, timezone
 from typing import Optional
 
-from mcphawk.logger import log_message
+from mcphawk.logger import BatchLogWriter, log_message
 from mcphawk.stdio_server_detector_fallback import (
     detect_server_from_command,
     merge_server_info,
 )
-from mcphawk.web.broadcaster import broadcast_new_log
+from mcphawk.utils import extract_client_info, extract_server_info
+from mcphawk.web.broadcaster import broadcast_from_thread
 
 logger = logging.getLogger(__name__)
 
+# (src_ip, dst_ip, direction) stored for each stdio direction
+_DIRECTION_FIELDS = {
+    "client->server": ("mcp-client", "mcp-server", "outgoing"),
+    "server->client": ("mcp-server", "mcp-client", "incoming"),
+}
+
 
 class MCPWrapper:
     """Transparently wrap an MCP server to capture stdio traffic."""
@@ -36,8 +43,13 @@ class MCPWrapper:
         self.client_info = None  # Track client info from initialize request
         self.server_info_fallback = detect_server_from_command(command)  # Fallback detection
         self.stdin_thread: Optional[threading.Thread] = None
-        self.stdout_thread: Optional[threading.Thread] = None
-        self.stderr_thread: Optional[threading.Thread] = None
+        self.output_thread: Optional[threading.Thread] = None
+        # Set while start() runs so the forwarding threads don't wait on SQLite
+        self.log_writer: Optional[BatchLogWriter] = None
+        # Serialized metadata per direction; only changes when server/client
+        # info is captured, so it is rebuilt then instead of per message
+        self._metadata_json: dict[str, str] = {}
+        self._reset_output_state()
 
     def start(self) -> int:
         """Start the wrapper and return exit code."""
@@ -50,37 +62,32 @@ class MCPWrapper:
                 stdin=subprocess.PIPE,
                 stdout=subprocess.PIPE,
                 stderr=subprocess.PIPE,
-                text=True,
-                bufsize=0  # Unbuffered for real-time
+                bufsize=0  # Unbuffered for real-time; bytes are decoded only for capture
             )
 
             self.running = True
+            self._reset_output_state()
+
+            self.log_writer = BatchLogWriter()
+            self.log_writer.start()
 
             # Start forwarding threads
             self.stdin_thread = threading.Thread(
                 target=self._forward_stdin,
                 daemon=True
             )
-            self.stdout_thread = threading.Thread(
-                target=self._forward_stdout,
-                daemon=True
-            )
-            self.stderr_thread = threading.Thread(
-                target=self._forward_stderr,
+            self.output_thread = threading.Thread(
+                target=self._forward_output,
                 daemon=True
             )
 
             self.stdin_thread.start()
-            self.stdout_thread.start()
-            self.stderr_thread.start()
+            self.output_thread.start()
 
             # Wait for process to complete
             return_code = self.proc.wait()
             self.running = False
 
-            # Give threads time to finish
-            time.sleep(0.1)
-
             return return_code
 
         except KeyboardInterrupt:
@@ -91,6 +98,29 @@ class MCPWrapper:
             logger.error(f"Wrapper error: {e}")
             self.stop()
             return 1
+        finally:
+            # Let the forwarding threads finish draining the server's last
+            # output before flushing what they captured
+            self._join_forwarders()
+            writer, self.log_writer = self.log_writer, None
+            if writer:
+                writer.stop()
+
+    def _reset_output_state(self):
+        """Clear the per-run state kept by the stdout/stderr handlers."""
+        # A message cut across stdout reads is kept here until its newline
+        # arrives; stderr is free-form text and is forwarded as it comes
+        self._stdout_buf = bytearray()
+        self._stderr_decoder = codecs.getincrementaldecoder("utf-8")(errors="replace")
+
+    def _join_forwarders(self, timeout: float = 2.0):
+        """Wait for the forwarding threads to finish after the server exits."""
+        if self.output_thread:
+            # Exits on its own once both pipes reach EOF
+            self.output_thread.join(timeout)
+        if self.stdin_thread:
+            # Usually still blocked reading our own stdin, so don't wait long
+            self.stdin_thread.join(0.1)
 
     def stop(self):
         """Stop the wrapper and subprocess."""
@@ -105,83 +135,118 @@ class MCPWrapper:
     def _forward_stdin(self):
         """Forward stdin from parent to subprocess, capturing JSON-RPC."""
         try:
-            buffer = ""
             while self.running and self.proc and self.proc.stdin:
-                # Read from our stdin
-                char = sys.stdin.read(1)
-                if not char:
+                # JSON-RPC over stdio is newline-delimited, so forward whole lines
+                line = sys.stdin.buffer.readline()
+                if not line:
                     break
 
                 # Forward to subprocess
-                self.proc.stdin.write(char)
+                self.proc.stdin.write(line)
                 self.proc.stdin.flush()
 
-                # Build buffer for JSON detection
-                buffer += char
-
-                # Check for complete JSON messages
-                if char == '\n':
-                    line = buffer.strip()
-                    if line:
-                        self._try_parse_json(line, "client->server")
-                    buffer = ""
+                self._capture_line(line, "client->server")
 
         except Exception as e:
             if self.debug:
                 logger.debug(f"stdin forward error: {e}")
 
-    def _forward_stdout(self):
-        """Forward stdout from subprocess to parent, capturing JSON-RPC."""
+    def _forward_output(self):
+        """Forward stdout and stderr from subprocess to parent, capturing JSON-RPC."""
         try:
-            buffer = ""
-            while self.running and self.proc and self.proc.stdout:
-                # Read from subprocess
-                char = self.proc.stdout.read(1)
-                if not char:
-                    break
-
-                # Forward to our stdout
-                sys.stdout.write(char)
-                sys.stdout.flush()
-
-                # Build buffer for JSON detection
-                buffer += char
-
-                # Check for complete JSON messages
-                if char == '\n':
-                    line = buffer.strip()
-                    if line:
-                        self._try_parse_json(line, "server->client")
-                    buffer = ""
-
-        except Exception as e:
-            if self.debug:
-                logger.debug(f"stdout forward error: {e}")
-
-    def _forward_stderr(self):
-        """Forward stderr from subprocess to parent."""
-        try:
-            while self.running and self.proc and self.proc.stderr:
-                # Read from subprocess
-                char = self.proc.stderr.read(1)
-                if not char:
-                    break
-
-                # Forward to our stderr
-                sys.stderr.write(char)
-                sys.stderr.flush()
+            streams = {}
+            if self.proc and self.proc.stdout:
+                streams[self.proc.stdout.fileno()] = self._on_stdout
+            if self.proc and self.proc.stderr:
+                streams[self.proc.stderr.fileno()] = self._on_stderr
+
+            if sys.platform == "win32":
+                # Pipes can't be selected on Windows, so read each from its own thread
+                readers = [
+                    threading.Thread(target=self._pump, args=(fd, handler), daemon=True)
+                    for fd, handler in streams.items()
+                ]
+                for reader in readers:
+                    reader.start()
+                for reader in readers:
+                    reader.join()
+            else:
+                with selectors.DefaultSelector() as sel:
+                    for fd, handler in streams.items():
+                        sel.register(fd, selectors.EVENT_READ, handler)
+
+                    # Run until both pipes hit EOF; once stopped, only keep
+                    # going while there is still output to drain
+                    while sel.get_map():
+                        ready = sel.select(timeout=0.1)
+                        if not ready and not self.running:
+                            break
+                        for key, _ in ready:
+                            chunk = os.read(key.fd, 65536)
+                            if chunk:
+                                key.data(chunk)
+                            else:
+                                sel.unregister(key.fd)
+
+            # Capture a final message the server didn't newline-terminate
+            self._capture_line(self._stdout_buf, "server->client")
 
         except Exception as e:
             if self.debug:
-                logger.debug(f"stderr forward error: {e}")
+                logger.debug(f"output forward error: {e}")
+
+    def _pump(self, fd: int, handler):
+        """Read ``fd`` until EOF, handing each chunk to ``handler``."""
+        # Keep reading after running is cleared: the server may have written
+        # its last output right before exiting
+        while True:
+            chunk = os.read(fd, 65536)
+            if not chunk:
+                break
+            handler(chunk)
+
+    def _on_stdout(self, chunk: bytes):
+        """Forward a chunk of server stdout and capture the complete lines in it."""
+        # Forward to our stdout byte for byte
+        sys.stdout.buffer.write(chunk)
+        sys.stdout.buffer.flush()
+
+        # Only the new bytes need scanning; a long message arriving over many
+        # reads is appended in place instead of re-copied and re-split each time
+        buf = self._stdout_buf
+        buf += chunk
+        start = 0
+        nl = buf.find(b"\n", len(buf) - len(chunk))
+        while nl != -1:
+            self._capture_line(buf[start:nl], "server->client")
+            start = nl + 1
+            nl = buf.find(b"\n", start)
+        del buf[:start]
+
+    def _on_stderr(self, chunk: bytes):
+        """Forward a chunk of server stderr."""
+        sys.stderr.write(self._stderr_decoder.decode(chunk))
+        sys.stderr.flush()
+
+    def _capture_line(self, line: bytes, direction: str):
+        """Decode a raw line and try to capture it, if it can be JSON-RPC at all."""
+        # Most non-protocol output (logs, banners) is dropped here without
+        # paying for UTF-8 decoding
+        line = line.strip()
+        if line.startswith(b"{") and b'"jsonrpc"' in line:
+            self._parse_jsonrpc(line.decode("utf-8", errors="replace"), direction)
 
     def _try_parse_json(self, line: str, direction: str):
         """Try to parse a line as JSON-RPC and log if successful."""
+        # Skip empty lines and anything that can't be a JSON-RPC object
+        # (e.g. log chatter) without paying for a failed parse
+        if not line or line[0] != "{" or '"jsonrpc"' not in line:
+            return
+        self._parse_jsonrpc(line, direction)
+
+    def _parse_jsonrpc(self, line: str, direction: str):
+        """Parse a line that passed the JSON-RPC prefilter and log it if valid."""
         try:
-            # Skip empty lines
-            if not line.strip():
-                return
-
             # Try to parse as JSON
             msg = json.loads(line)
 
@@ -190,23 +255,24 @@ class MCPWrapper:
                 # Extract server/client info if this is an initialize message
                 if direction == "client->server":
                     # Check for client info in initialize request
-                    from .utils import extract_client_info
-                    client_info = extract_client_info(json.dumps(msg))
+                    client_info = extract_client_info(msg)
                     if client_info:
                         self.client_info = client_info
+                        self._metadata_json.clear()
                         if self.debug:
                             logger.debug(f"Captured client info: {client_info}")
 
                 elif direction == "server->client":
                     # Check for server info in initialize response
-                    from .utils import extract_server_info
-                    server_info = extract_server_info(json.dumps(msg))
+                    server_info = extract_server_info(msg)
                     if server_info:
                         self.server_info = server_info
+                        self._metadata_json.clear()
                         if self.debug:
                             logger.debug(f"Captured server info: {server_info}")
 
-                self._log_jsonrpc_message(msg, direction)
+                # The line is already valid JSON, so store it as-is
+                self._log_jsonrpc_message(msg, direction, raw=line)
 
         except json.JSONDecodeError:
             # Not JSON, ignore
@@ -215,43 +281,47 @@ class MCPWrapper:
             if self.debug:
                 logger.debug(f"Error parsing JSON: {e}")
 
-    def _log_jsonrpc_message(self, message: dict, direction: str):
-        """Log a JSON-RPC message to the database."""
+    def _build_metadata(self, direction: str) -> str:
+        """Serialize the metadata stored with every message in ``direction``."""
+        metadata = {
+            "wrapper": True,
+            "command": self.command,
+            "direction": direction
+        }
+
+        # Merge server info (protocol takes precedence over fallback)
+        merged_server_info = merge_server_info(self.server_info_fallback, self.server_info)
+        if merged_server_info:
+            metadata["server_name"] = merged_server_info["name"]
+            metadata["server_version"] = merged_server_info["version"]
+
+        # Add client info if we have it
+        if self.client_info:
+            metadata["client_name"] = self.client_info["name"]
+            metadata["client_version"] = self.client_info["version"]
+
+        return json.dumps(metadata)
+
+    def _log_jsonrpc_message(self, message: dict, direction: str, raw: Optional[str] = None):
+        """
+        Log a JSON-RPC message to the database.
+
+        ``raw`` is the original line the message was parsed from; when given it
+        is stored instead of re-encoding ``message``.
+        """
         try:
             # Create log entry
             ts = datetime.now(tz=timezone.utc)
             log_id = str(uuid.uuid4())
 
-            # Parse direction
-            if direction == "client->server":
-                src_ip = "mcp-client"
-                dst_ip = "mcp-server"
-                flow_direction = "outgoing"
-            else:
-                src_ip = "mcp-server"
-                dst_ip = "mcp-client"
-                flow_direction = "incoming"
+            src_ip, dst_ip, flow_direction = _DIRECTION_FIELDS[direction]
 
             # Get process info
             pid = self.proc.pid if self.proc else os.getpid()
 
-            # Build metadata with server info
-            metadata = {
-                "wrapper": True,
-                "command": self.command,
-                "direction": direction
-            }
-
-            # Merge server info (protocol takes precedence over fallback)
-            merged_server_info = merge_server_info(self.server_info_fallback, self.server_info)
-            if merged_server_info:
-                metadata["server_name"] = merged_server_info["name"]
-                metadata["server_version"] = merged_server_info["version"]
-
-            # Add client info if we have it
-            if self.client_info:
-                metadata["client_name"] = self.client_info["name"]
-                metadata["client_version"] = self.client_info["version"]
+            metadata = self._metadata_json.get(direction)
+            if metadata is None:
+                metadata = self._metadata_json[direction] = self._build_metadata(direction)
 
             entry = {
                 "log_id": log_id,
@@ -261,27 +331,25 @@ class MCPWrapper:
                 "dst_ip": dst_ip,
                 "dst_port": None,  # No port for stdio
                 "direction": flow_direction,
-                "message": json.dumps(message),
+                "message": raw if raw is not None else json.dumps(message),
                 "transport_type": "stdio",
-                "metadata": json.dumps(metadata),
+                "metadata": metadata,
                 "pid": pid  # Add PID field
             }
 
             # Log to database
-            log_message(entry)
+            if self.log_writer:
+                self.log_writer.submit(entry)
+            else:
+                log_message(entry)
 
             # Broadcast to web UI
             broadcast_entry = dict(entry)
             broadcast_entry["timestamp"] = ts.isoformat()
 
-            # Try to broadcast
-            try:
-                loop = asyncio.get_running_loop()
-                _ = loop.create_task(broadcast_new_log(broadcast_entry))  # noqa: RUF006
-            except RuntimeError:
-                # No event loop in this thread, try to create one
-                with contextlib.suppress(Exception):
-                    asyncio.run(broadcast_new_log(broadcast_entry))
+            # Hand off to the web server's event loop, if one has clients
+            with contextlib.suppress(Exception):
+                broadcast_from_thread(broadcast_entry)
 
             # Log info
             method = message.get("method", "response")
@@ -16,6 +16,12 @@ from mcphawk.logger import (
 )
 
 
+def _entry(log_id):
+    """Build a minimal log entry with the given ``log_id``."""
+    return {"log_id": log_id, "src_ip": "127.0.0.1", "dst_ip": "127.0.0.1",
+            "message": '{"jsonrpc":"2.0","method":"test"}'}
+
+
 class TestDBConnection:
     """Test the database connection context manager."""
 
@@ -141,6 +147,31 @@ class TestLogger:
                 assert col in columns
                 assert columns[col] == dtype
 
+    def test_init_db_creates_timestamp_index(self, temp_db):
+        """Test that the timestamp/transport index exists and is used."""
+        init_db()  # Idempotent on an existing database
+
+        with get_db_connection(Path(temp_db)) as conn:
+            cursor = conn.cursor()
+            cursor.execute("PRAGMA index_info(idx_logs_ts_transport)")
+            assert [col[2] for col in cursor.fetchall()] == ["timestamp", "transport_type"]
+
+            cursor.execute(
+                "EXPLAIN QUERY PLAN SELECT * FROM logs ORDER BY timestamp DESC LIMIT 10"
+            )
+            plan = " ".join(row[3] for row in cursor.fetchall())
+            assert "idx_logs_ts_transport" in plan
+
+    def test_init_db_enables_wal(self, temp_db):
+        """Test that the database uses WAL and writers skip per-commit fsync."""
+        from mcphawk import logger as logger_module
+
+        with get_db_connection(Path(temp_db)) as conn:
+            assert conn.execute("PRAGMA journal_mode").fetchone()[0] == "wal"
+
+        # synchronous=NORMAL is 1
+        assert logger_module._get_writer_connection().execute("PRAGMA synchronous").fetchone()[0] == 1
+
     def test_log_message_basic(self, temp_db):
         """Test basic message logging."""
         entry = {
@@ -195,6 +226,81 @@ class TestLogger:
         assert logs[1]["log_id"] == "test-003"
         assert logs[2]["log_id"] == "test-002"
 
+    def test_log_message_reuses_connection_until_path_changes(self, temp_db, tmp_path):
+        """Test that writes share one connection per thread until the DB changes."""
+        from mcphawk import logger as logger_module
+
+        log_message(_entry("reuse-1"))
+        conn = logger_module._writer_local.conn
+        log_message(_entry("reuse-2"))
+        assert logger_module._writer_local.conn is conn
+
+        # A duplicate key rolls back without breaking the cached connection
+        with pytest.raises(sqlite3.IntegrityError):
+            log_message(_entry("reuse-2"))
+        log_message(_entry("reuse-3"))
+        assert [log["log_id"] for log in fetch_logs(10)] == ["reuse-3", "reuse-2", "reuse-1"]
+
+        # Switching databases reopens against the new path
+        set_db_path(str(tmp_path / "other.db"))
+        init_db()
+        log_message(_entry("other-1"))
+        assert logger_module._writer_local.conn is not conn
+        assert [log["log_id"] for log in fetch_logs(10)] == ["other-1"]
+
+    def test_log_messages_is_all_or_nothing(self, temp_db):
+        """Test that a bulk insert writes every entry or none of them."""
+        from mcphawk.logger import log_messages
+
+        log_messages([_entry("bulk-1"), _entry("bulk-2")])
+        with pytest.raises(ValueError):
+            log_messages([_entry("bulk-3"), _entry(None)])
+
+        assert sorted(log["log_id"] for log in fetch_logs(10)) == ["bulk-1", "bulk-2"]
+
+    def test_batch_log_writer(self, temp_db):
+        """Test that queued entries are written on stop, skipping only bad ones."""
+        from mcphawk.logger import BatchLogWriter
+
+        writer = BatchLogWriter()
+        writer.start()
+        for log_id in ("batch-1", "batch-2", "batch-1", "batch-3"):
+            writer.submit(_entry(log_id))
+        writer.stop()
+
+        assert sorted(log["log_id"] for log in fetch_logs(10)) == ["batch-1", "batch-2", "batch-3"]
+
+    def test_batch_log_writer_drops_oldest_when_full(self):
+        """Test that a full queue drops the oldest entry instead of blocking."""
+        from mcphawk.logger import BatchLogWriter
+
+        writer = BatchLogWriter(max_queue=2)  # Not started, so nothing drains
+        for log_id in ("drop-1", "drop-2", "drop-3"):
+            writer.submit({"log_id": log_id})
+
+        assert writer.dropped == 1
+        assert [writer._queue.get_nowait()["log_id"] for _ in range(2)] == ["drop-2", "drop-3"]
+
+    def test_batch_log_writer_submit_after_stop(self, temp_db):
+        """Test that entries arriving after stop() neither hang nor evict the stop sentinel."""
+        from mcphawk.logger import BatchLogWriter
+
+        # An entry queued behind the sentinel still lets the worker finish
+        writer = BatchLogWriter()
+        for item in (_entry("late-1"), BatchLogWriter._STOP, _entry("late-2")):
+            writer._queue.put(item)
+        writer._run()
+        assert sorted(log["log_id"] for log in fetch_logs(10)) == ["late-1", "late-2"]
+
+        # Once stopped, submit refuses entries instead of queueing them
+        writer = BatchLogWriter(max_queue=1)
+        writer.start()
+        thread = writer._thread
+        writer.stop()
+        assert not thread.is_alive()
+        assert writer.submit(_entry("late-3")) is False
+        assert writer._queue.empty()
+
 
 class TestPIDSupport:
     """Test PID field in database schema and operations."""
@@ -443,3 +549,94 @@ class TestTransportType:
                 assert log["src_port"] is not None
                 assert log["dst_port"] is not None
 
+
+class TestTrafficStats:
+    """Test the SQL-side traffic aggregation helpers."""
+
+    MESSAGES = (
+        ('{"jsonrpc":"2.0","method":"tools/list","id":1}', "stdio"),
+        ('{"jsonrpc":"2.0","method":"tools/call","id":null}', "stdio"),
+        ('{"jsonrpc":"2.0","result":{"tools":[]},"id":1}', "streamable_http"),
+        ('{"jsonrpc":"2.0","method":"notifications/progress"}', "streamable_http"),
+        ('{"jsonrpc":"2.0","error":{"code":-32601},"id":2}', "http_sse"),
+        ('{"jsonrpc":"2.0","error":{"code":-32700}}', "http_sse"),
+        ('{"jsonrpc":"1.0","method":"old","id":3}', "unknown"),
+        ('{"jsonrpc":2.0,"method":"numeric_version","id":4}', "unknown"),
+        ('[{"jsonrpc":"2.0","method":"batched","id":5}]', "unknown"),
+        ('{"jsonrpc":"2.0","method":"truncated"', "unknown"),
+        ('{"jsonrpc":"2.0","method":42,"id":6}', None),
+    )
+
+    @pytest.fixture
+    def populated_db(self):
+        """Create a temporary database containing MESSAGES."""
+        with tempfile.NamedTemporaryFile(suffix='.db', delete=False) as f:
+            temp_path = f.name
+
+        set_db_path(temp_path)
+        init_db()
+        for i, (message, transport) in enumerate(self.MESSAGES):
+            entry = {
+                "log_id": f"stats-{i}",
+                "timestamp": datetime.now(tz=timezone.utc),
+                "message": message,
+            }
+            if transport is not None:
+                entry["transport_type"] = transport
+            log_message(entry)
+
+        yield temp_path
+
+        Path(temp_path).unlink(missing_ok=True)
+
+    def test_stats_match_python_classification(self, populated_db):
+        """SQL classification must agree with utils.get_message_type."""
+        import json
+
+        from mcphawk.logger import get_traffic_stats
+        from mcphawk.utils import get_message_type
+
+        types = [get_message_type(message) for message, _ in self.MESSAGES]
+        errors = 0
+        for message, _ in self.MESSAGES:
+            try:
+                if "error" in json.loads(message):
+                    errors += 1
+            except json.JSONDecodeError:
+                pass
+
+        stats = get_traffic_stats()
+        assert stats["total_logs"] == len(self.MESSAGES)
+        assert stats["requests"] == types.count("request")
+        assert stats["responses"] == types.count("response")
+        assert stats["notifications"] == types.count("notification")
+        assert stats["errors"] == errors
+        assert stats["by_transport_type"] == {
+            "stdio": 2,
+            "streamable_http": 2,
+            "http_sse": 2,
+            "unknown": 5,
+        }
+
+    def test_unique_methods_skips_invalid_messages(self, populated_db):
+        """Only string methods from well-formed JSON are reported."""
+        from mcphawk.logger import get_unique_methods
+
+        assert get_unique_methods() == [
+            "notifications/progress",
+            "numeric_version",
+            "old",
+            "tools/call",
+            "tools/list",
+        ]
+
+    def test_search_by_message_type_applies_limit_after_filter(self, populated_db):
+        """Filtering by message type happens before LIMIT, not after."""
+        from mcphawk.logger import search_logs
+
+        # stats-2..stats-9 sort ahead of the requests but must not use up the limit
+        results = search_logs(message_type="request", limit=2)
+        assert [log["log_id"] for log in results] == ["stats-10", "stats-1"]
+
+        results = search_logs(message_type="error", transport_type="http_sse")
+        assert [log["log_id"] for log in results] == ["stats-4"]
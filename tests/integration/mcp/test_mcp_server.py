@@ -48,12 +48,9 @@ def sample_logs(test_db):
         }
     ]
 
-    log_ids = []
-    for i, msg in enumerate(test_messages):
-        log_id = str(uuid.uuid4())
-        log_ids.append(log_id)
-        entry = {
-            "log_id": log_id,
+    entries = [
+        {
+            "log_id": str(uuid.uuid4()),
             "timestamp": datetime.now(tz=timezone.utc),
             "src_ip": "127.0.0.1",
             "dst_ip": "127.0.0.1",
@@ -63,9 +60,12 @@ def sample_logs(test_db):
             "message": json.dumps(msg),
             "transport_type": "unknown"
         }
-        logger.log_message(entry)
+        for i, msg in enumerate(test_messages)
+    ]
+    # One transaction for the whole fixture
+    logger.log_messages(entries)
 
-    return log_ids
+    return [entry["log_id"] for entry in entries]
 
 
 class TestMCPServer:
@@ -169,6 +169,23 @@ class TestMCPServer:
         assert len(data) == 4
         assert all(log["transport_type"] == "unknown" for log in data)
 
+    @pytest.mark.asyncio
+    async def test_queries_offloaded_for_http(self, sample_logs):
+        """Test that HTTP mode runs database queries in a worker thread."""
+        server = MCPHawkServer()
+        stats_tool = server.mcp._tool_manager._tools["get_stats"]
+
+        with patch("mcphawk.mcp_server.server.asyncio.to_thread", wraps=asyncio.to_thread) as mock_to_thread:
+            # stdio (default) runs queries inline
+            await stats_tool.fn()
+            mock_to_thread.assert_not_called()
+
+            server._offload_queries = True
+            result = await stats_tool.fn()
+            mock_to_thread.assert_called_once_with(logger.get_traffic_stats)
+
+        assert json.loads(result)["total_logs"] == 4
+
     @pytest.mark.asyncio
     async def test_error_handling(self, test_db):
         """Test error handling in tool functions."""
@@ -1,8 +1,17 @@
-from unittest.mock import AsyncMock
+import asyncio
+import json
+from collections import deque
+from unittest.mock import AsyncMock, MagicMock
 
 import pytest
 
-from mcphawk.web.broadcaster import active_clients, broadcast_new_log
+from mcphawk.web import broadcaster
+from mcphawk.web.broadcaster import (
+    active_clients,
+    add_client,
+    broadcast_from_thread,
+    broadcast_new_log,
+)
 
 
 @pytest.mark.asyncio
@@ -12,8 +21,8 @@ async def test_broadcast_new_log_with_clients():
     mock_client2 = AsyncMock()
 
     # Add to active clients
-    active_clients.append(mock_client1)
-    active_clients.append(mock_client2)
+    active_clients.add(mock_client1)
+    active_clients.add(mock_client2)
 
     try:
         # Broadcast a message
@@ -25,9 +34,13 @@ async def test_broadcast_new_log_with_clients():
 
         await broadcast_new_log(test_log)
 
-        # Verify both clients received the message
-        mock_client1.send_json.assert_called_once_with(test_log)
-        mock_client2.send_json.assert_called_once_with(test_log)
+        # Verify both clients received the same pre-encoded message
+        mock_client1.send_text.assert_called_once()
+        mock_client2.send_text.assert_called_once()
+        payload = mock_client1.send_text.call_args[0][0]
+        assert json.loads(payload) == test_log
+        assert mock_client2.send_text.call_args[0][0] is payload
+        mock_client1.send_json.assert_not_called()
 
     finally:
         # Clean up
@@ -41,11 +54,11 @@ async def test_broadcast_new_log_with_disconnected_client():
     mock_client2 = AsyncMock()
 
     # Make client1 throw an exception (disconnected)
-    mock_client1.send_json.side_effect = Exception("Disconnected")
+    mock_client1.send_text.side_effect = Exception("Disconnected")
 
     # Add to active clients
-    active_clients.append(mock_client1)
-    active_clients.append(mock_client2)
+    active_clients.add(mock_client1)
+    active_clients.add(mock_client2)
 
     try:
         # Broadcast a message
@@ -58,7 +71,8 @@ async def test_broadcast_new_log_with_disconnected_client():
         assert mock_client2 in active_clients
 
         # Client2 should still receive the message
-        mock_client2.send_json.assert_called_once_with(test_log)
+        mock_client2.send_text.assert_called_once()
+        assert json.loads(mock_client2.send_text.call_args[0][0]) == test_log
 
     finally:
         # Clean up
@@ -67,8 +81,108 @@ async def test_broadcast_new_log_with_disconnected_client():
 
 @pytest.mark.asyncio
 async def test_broadcast_new_log_no_clients():
-    # Ensure list is empty
+    # Ensure set is empty
     active_clients.clear()
 
     # Should not raise any errors
     await broadcast_new_log({"test": "data"})
+
+
+@pytest.mark.asyncio
+async def test_broadcast_from_thread_runs_on_client_loop():
+    mock_client = AsyncMock()
+    add_client(mock_client)
+
+    try:
+        # Called from a worker thread, like the sniffer and stdio wrapper do
+        await asyncio.to_thread(broadcast_from_thread, {"test": "data"})
+
+        for _ in range(100):
+            if mock_client.send_text.called:
+                break
+            await asyncio.sleep(0.01)
+
+        mock_client.send_text.assert_called_once()
+        assert json.loads(mock_client.send_text.call_args[0][0]) == {"test": "data"}
+
+    finally:
+        active_clients.clear()
+        broadcaster._heartbeat_task.cancel()
+
+
+def test_broadcast_from_thread_no_clients():
+    active_clients.clear()
+
+    # No client loop to hand off to; should not raise or start a loop
+    broadcast_from_thread({"test": "data"})
+
+
+@pytest.mark.asyncio
+async def test_broadcast_from_thread_keeps_order_of_burst():
+    mock_client = AsyncMock()
+    add_client(mock_client)
+
+    def burst():
+        for i in range(50):
+            broadcast_from_thread({"seq": i})
+
+    try:
+        await asyncio.to_thread(burst)
+
+        for _ in range(100):
+            if mock_client.send_text.call_count == 50:
+                break
+            await asyncio.sleep(0.01)
+
+        sent = [json.loads(c[0][0])["seq"] for c in mock_client.send_text.call_args_list]
+        assert sent == list(range(50))
+        assert not broadcaster._pending
+
+    finally:
+        active_clients.clear()
+        broadcaster._heartbeat_task.cancel()
+
+
+@pytest.mark.asyncio
+async def test_stalled_client_is_dropped_and_closed(monkeypatch):
+    monkeypatch.setattr(broadcaster, "SEND_TIMEOUT", 0.05)
+
+    async def never_returns(payload):
+        await asyncio.Event().wait()
+
+    stalled = AsyncMock()
+    stalled.send_text.side_effect = never_returns
+    healthy = AsyncMock()
+    active_clients.update({stalled, healthy})
+
+    try:
+        await broadcast_new_log({"test": "data"})
+
+        assert stalled not in active_clients
+        assert healthy in active_clients
+        healthy.send_text.assert_called_once()
+
+        # The stalled socket is closed so the dashboard reconnects
+        await asyncio.gather(*broadcaster._closing)
+        stalled.close.assert_awaited_once_with(code=1011)
+        healthy.close.assert_not_called()
+    finally:
+        active_clients.clear()
+
+
+def test_broadcast_queue_is_bounded(monkeypatch):
+    monkeypatch.setattr(broadcaster, "_pending", deque(maxlen=3))
+    monkeypatch.setattr(broadcaster, "_client_loop", MagicMock(is_closed=lambda: False))
+    # Pretend a drain is already pending so nothing is scheduled
+    monkeypatch.setattr(broadcaster, "_drain_scheduled", True)
+    monkeypatch.setattr(broadcaster, "_dropped", 0)
+    active_clients.add(AsyncMock())
+
+    try:
+        for i in range(5):
+            broadcast_from_thread({"seq": i})
+
+        assert [entry["seq"] for entry in broadcaster._pending] == [2, 3, 4]
+        assert broadcaster._dropped == 2
+    finally:
+        active_clients.clear()
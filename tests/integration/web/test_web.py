@@ -14,7 +14,7 @@ from datetime import datetime, timezone
 import pytest
 from fastapi.testclient import TestClient
 
-from mcphawk.logger import init_db, log_message, set_db_path
+from mcphawk.logger import init_db, log_message, log_messages, set_db_path
 from mcphawk.web.broadcaster import broadcast_new_log
 from mcphawk.web.server import app
 
@@ -218,17 +218,19 @@ def test_logs_order_newest_first(setup_test_db):
 
 def test_logs_default_limit(setup_test_db):
     """Test that default limit of 50 is applied."""
-    # Add 60 logs
-    for i in range(60):
-        log_message({
-        "log_id": str(uuid.uuid4()),"timestamp": datetime.now(timezone.utc),
+    # Add 60 logs in one transaction
+    log_messages([
+        {
+            "log_id": str(uuid.uuid4()),"timestamp": datetime.now(timezone.utc),
             "src_ip": "127.0.0.1",
             "dst_ip": "127.0.0.1",
             "src_port": 12345,
             "dst_port": 8080,
             "direction": "incoming",
             "message": f'{{"jsonrpc":"2.0","method":"bulk","id":{i}}}'
-        })
+        }
+        for i in range(60)
+    ])
 
     # Request without limit should return 50
     response = client.get("/logs")
@@ -63,20 +63,11 @@ def test_websocket_connection():
 
 
 def test_websocket_ping_pong():
-    import asyncio
-    with TestClient(app) as client, patch("asyncio.wait_for") as mock_wait_for:
-        # Mock asyncio.wait_for to simulate timeout
-        mock_wait_for.side_effect = asyncio.TimeoutError()
-
-        with client.websocket_connect("/ws") as websocket:
-            # This should trigger the timeout handling
-            try:
-                # The server should send a ping
-                data = websocket.receive_json()
-                assert data == {"type": "ping"}
-            except Exception:
-                # Connection might close, that's ok
-                pass
+    with TestClient(app) as client, patch("mcphawk.web.broadcaster.HEARTBEAT_INTERVAL", 0.01), \
+            client.websocket_connect("/ws") as ws1, client.websocket_connect("/ws") as ws2:
+        # A single shared heartbeat pings every connected client
+        assert ws1.receive_json() == {"type": "ping"}
+        assert ws2.receive_json() == {"type": "ping"}
 
 
 def test_websocket_disconnect():
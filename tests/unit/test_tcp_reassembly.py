@@ -89,6 +89,17 @@ class TestHTTPStream:
         messages = stream.extract_sse_messages()
         assert len(messages) == 0  # Should wait for more data
 
+    def test_extract_chunked_data_multiple_chunks(self):
+        """Test that several chunks are joined and only the remainder is kept."""
+        stream = HTTPStream()
+        stream.is_chunked = True
+
+        # Two complete chunks followed by the start of the next size line
+        stream.buffer = b'5\r\nhello\r\n6\r\n world\r\n1'
+
+        assert stream.extract_chunked_data() == b'hello world'
+        assert stream.buffer == b'1'
+
     def test_parse_http_response_headers(self):
         """Test HTTP response header parsing."""
         stream = HTTPStream()
@@ -224,3 +235,36 @@ class TestTCPStreamReassembler:
         assert len(messages) == 1
         assert messages[0]["message"] == '{"client":"B"}'
         assert messages[0]["dst_port"] == 2222
+
+    def test_stream_table_is_bounded(self):
+        """Test that the least recently seen stream is evicted past max_streams."""
+        reassembler = TCPStreamReassembler(max_streams=2)
+
+        def request(sport):
+            return Ether() / IP(src="10.0.0.1", dst="10.0.0.2") / TCP(sport=sport, dport=8765) / Raw(
+                b"POST /mcp HTTP/1.1\r\n\r\n"
+            )
+
+        reassembler.process_packet(request(1111))
+        reassembler.process_packet(request(2222))
+        reassembler.process_packet(request(1111))  # 2222 is now the oldest
+        reassembler.process_packet(request(3333))
+
+        assert [key.key[1] for key in reassembler.streams] == [1111, 3333]
+
+    def test_cleanup_old_streams_removes_idle_streams(self):
+        """Test that only streams idle past the timeout are removed."""
+        reassembler = TCPStreamReassembler()
+
+        for sport in (1111, 2222):
+            reassembler.process_packet(
+                Ether() / IP(src="10.0.0.1", dst="10.0.0.2") / TCP(sport=sport, dport=8765) / Raw(
+                    b"POST /mcp HTTP/1.1\r\n\r\n"
+                )
+            )
+
+        idle, active = reassembler.streams.values()
+        idle.last_seen -= 600
+
+        assert reassembler.cleanup_old_streams(timeout=300) == 1
+        assert list(reassembler.streams.values()) == [active]
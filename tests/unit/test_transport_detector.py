@@ -24,6 +24,15 @@ class TestTransportDetection:
         )
         assert transport == MCPTransport.STREAMABLE_HTTP
 
+    def test_streamable_http_dual_accept_with_params(self):
+        """Test Streamable HTTP detection with quality params and mixed case."""
+        transport = detect_transport_from_http(
+            method="POST",
+            path="/mcp",
+            headers={"accept": "Application/JSON;q=0.9, text/event-stream"}
+        )
+        assert transport == MCPTransport.STREAMABLE_HTTP
+
     def test_post_without_accept_headers(self):
         """Test that POST without Accept headers returns UNKNOWN.
 
@@ -177,3 +186,36 @@ class TestTransportTracker:
 
         # Should still be STREAMABLE_HTTP
         assert tracker.get_transport("127.0.0.1", 12345, "127.0.0.1", 8080) == MCPTransport.STREAMABLE_HTTP
+
+    def test_tracker_uses_slots(self):
+        """Test that the tracker does not carry a per-instance __dict__."""
+        tracker = TransportTracker()
+        assert not hasattr(tracker, "__dict__")
+
+    def test_transports_are_bounded(self):
+        """Test that the least recently used connections are evicted."""
+        tracker = TransportTracker(max_connections=4)
+
+        tracker.update_transport("10.0.0.1", 1000, "10.0.0.2", 80, MCPTransport.STREAMABLE_HTTP)
+        tracker.update_transport("10.0.0.1", 1001, "10.0.0.2", 80, MCPTransport.STREAMABLE_HTTP)
+
+        # Touch the first connection so the second one is evicted next
+        assert tracker.get_transport("10.0.0.1", 1000, "10.0.0.2", 80) == MCPTransport.STREAMABLE_HTTP
+        tracker.update_transport("10.0.0.1", 1002, "10.0.0.2", 80, MCPTransport.STREAMABLE_HTTP)
+
+        assert len(tracker.transports) == 4
+        assert tracker.get_transport("10.0.0.1", 1000, "10.0.0.2", 80) == MCPTransport.STREAMABLE_HTTP
+        # The touched connection's reverse direction was refreshed too
+        assert tracker.get_transport("10.0.0.2", 80, "10.0.0.1", 1000) == MCPTransport.STREAMABLE_HTTP
+        assert tracker.get_transport("10.0.0.1", 1002, "10.0.0.2", 80) == MCPTransport.STREAMABLE_HTTP
+        assert tracker.get_transport("10.0.0.1", 1001, "10.0.0.2", 80) == MCPTransport.UNKNOWN
+
+    def test_http_sse_servers_are_bounded(self):
+        """Test that the HTTP+SSE server registry has its own cap."""
+        tracker = TransportTracker(max_servers=2)
+
+        for port in (8001, 8002, 8003):
+            tracker.update_transport("127.0.0.1", 50000, "127.0.0.1", port, MCPTransport.HTTP_SSE)
+
+        assert len(tracker.http_sse_servers) == 2
+        assert ("127.0.0.1", 8001) not in tracker.http_sse_servers
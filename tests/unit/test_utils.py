@@ -3,6 +3,7 @@
 import json
 
 from mcphawk.utils import (
+    LRUDict,
     extract_client_info,
     extract_server_info,
     get_message_type,
@@ -37,6 +38,13 @@ class TestParseMessage:
         result = parse_message("")
         assert result is None
 
+    def test_parse_non_object_json(self):
+        """Test that JSON arrays and scalars are not treated as messages."""
+        assert parse_message('[{"jsonrpc": "2.0", "method": "test", "id": 1}]') is None
+        assert parse_message("42") is None
+        assert get_message_type("[]") == "unknown"
+        assert get_method_name('["method"]') is None
+
 
 class TestGetMessageType:
     """Test get_message_type function."""
@@ -338,3 +346,17 @@ class TestExtractClientInfo:
         })
         result = extract_client_info(message)
         assert result is None
+
+
+class TestLRUDict:
+    """Test LRUDict container."""
+
+    def test_evicts_least_recently_written(self):
+        """Test that writes past maxsize evict the oldest entry, and rewrites refresh it."""
+        lru = LRUDict(2)
+        lru["a"] = 1
+        lru["b"] = 2
+        lru["a"] = 3
+        lru["c"] = 4
+
+        assert list(lru.items()) == [("a", 3), ("c", 4)]